@@ -0,0 +1,328 @@
+'''
+PDF text and citation extraction for the SSAR reference engine.
+
+Kept apart from streamlit_app.py so the upload pool's worker processes can import
+process_pdf without re-running the Streamlit script.
+'''
+
+import re
+import io
+import os
+import functools
+import itertools
+import pypdfium2 as pdfium
+import pdfplumber
+
+# ---------- CONSTANTS ----------
+SHORTFORM_MAP = {
+    "Administration of Muslim Law Act": "AMLA",
+    "Women’s Charter": "WC",
+    "Women's Charter": "WC",
+    "Women`s Charter": "WC",
+    "Muslim Marriage and Divorce Rules": "MMDR"
+}
+
+# Only the opening pages carry the case header and citation lists
+PAGES_TO_EXTRACT = 3
+
+# Extracted PDF text is kept on disk keyed by file hash, so re-uploaded PDFs skip parsing
+TEXT_CACHE_DIR = "pdf_text_cache"
+
+# Bound on both the on-disk text cache and the app's in-memory record cache
+PDF_CACHE_MAX_ENTRIES = 512
+
+# Header lines opening each citation list, matched case-insensitively as line prefixes
+LEGISLATION_MARKER = 'legislation referred to'
+QURANIC_MARKER = 'quranic verse(s) referred to'
+SECTION_MARKERS = {"legislation": LEGISLATION_MARKER, "quranic": QURANIC_MARKER}
+
+# Comprehensive stop markers to cleanly close the list extraction (lowercase line prefixes)
+STOP_MARKERS = (
+    'quranic verse', 'case referred to', 'cases referred to', 'issue', 'background', 
+    'at the syariah court', 'at the appeal board', 'introduction', 
+    'judgment', 'parties', 'defendant', 'plaintiff', 'conclusion', 
+    'order of', '[editorial note'
+)
+
+# Lines opening the judgment body; no citation window opens after them
+BODY_MARKERS = ('judgment', 'introduction')
+
+# ---------- COMPILED PATTERNS ----------
+# Compiled once at import so the per-line extraction loops skip the re module's cache lookup
+
+_CASES_REFERRED_RE = re.compile(r"^case\(s\)\s+referred\s+to", re.IGNORECASE)
+_PARTY_V_PARTY_RE = re.compile(r"^[A-Z]{2,}\s+v\s+[A-Z]{2,}$")
+_RE_PARTY_RE = re.compile(r"^Re\s+[A-Z]{2,}$", re.IGNORECASE)
+_SSAR_PREFIX_RE = re.compile(r'^\d+\s*SSAR[\\/]')
+_YEAR_RE = re.compile(r"(?:19|20)\d{2}")
+
+_CITATION_PARENS_RE = re.compile(r'\([^)]*(?:Cap|Rev\s*Ed|Act|Ordinance|19\d\d|20\d\d)[^)]*\)', re.IGNORECASE)
+_SECTION_MARKER_RE = re.compile(r"(?<!['’`])\b(s|ss|section|r|rule|rr)\b\s*(.*)", re.IGNORECASE)
+_ACT_NAME_RE = re.compile(r"(.*?\b(?:Act|Charter|Rules|Ordinance)\b)", re.IGNORECASE)
+_LIST_SPLIT_RE = re.compile(r',|and')
+_WHITESPACE_RE = re.compile(r'\s+')
+# Every long statute name in SHORTFORM_MAP, longest first, so one scan finds those present in an act name
+_SHORTFORM_RE = re.compile('|'.join(re.escape(long) for long in sorted(SHORTFORM_MAP, key=len, reverse=True)))
+
+_SURAH_RE = re.compile(r'Surah\s*(\d+)', re.IGNORECASE)
+_VERSE_LIST_RE = re.compile(r'verse[s]?\s*(.*)', re.IGNORECASE)
+_SURAH_VERSE_RE = re.compile(r'Surah\s*(\d+)\s*[:]\s*(\d+)', re.IGNORECASE)
+_CHAPTER_VERSE_RE = re.compile(r'\b(\d{1,3})\s*[:]\s*(\d+)\b')
+_NON_RANGE_CHARS_RE = re.compile(r'[^\d\-\–]')
+
+# ---------- EXTRACTION HELPERS ----------
+
+def split_sections(lines):
+    # One pass fills every header window; also returns the keys whose window is closed or can no longer open
+    sections = {key: [] for key in SECTION_MARKERS}
+    open_keys, closed_keys = set(), set()
+    for line in lines:
+        line_lc = line.lower()
+        if line_lc.startswith(BODY_MARKERS):
+            closed_keys = set(SECTION_MARKERS)
+            break
+        if open_keys:
+            if line_lc.startswith(STOP_MARKERS) or not line.strip():
+                closed_keys |= open_keys
+                open_keys = set()
+                if len(closed_keys) == len(SECTION_MARKERS):
+                    break
+            else:
+                for key in open_keys:
+                    sections[key].append(line.strip())
+        for key, marker in SECTION_MARKERS.items():
+            if key not in closed_keys and line_lc.startswith(marker):
+                open_keys.add(key)
+    return sections, closed_keys
+
+@functools.lru_cache(maxsize=1024)
+def add_short_forms(name):
+    # Memoized: the same act name recurs on every section line under it
+    out = [name]
+    for long in dict.fromkeys(_SHORTFORM_RE.findall(name)):
+        short = SHORTFORM_MAP[long]
+        if short not in name:
+            out.append(name.replace(long, short))
+    return tuple(out)
+
+def case_name_from_filename(filename):
+    clean_name = os.path.basename(filename)
+    clean_name = os.path.splitext(clean_name)[0]
+    clean_name = _SSAR_PREFIX_RE.sub('', clean_name)
+    return clean_name.strip()
+
+def scan_top(lines, filename):
+    # One walk finds the case name (first 15 non-empty lines) and the first year, then stops
+    case_name, year = None, None
+    name_lines_left = 15
+    
+    for line in lines:
+        if year is None:
+            match = _YEAR_RE.search(line)
+            if match:
+                year = int(match.group())
+        
+        if case_name is None and name_lines_left:
+            stripped = line.strip()
+            if stripped:
+                name_lines_left -= 1
+                if _CASES_REFERRED_RE.match(stripped):
+                    name_lines_left = 0
+                elif _PARTY_V_PARTY_RE.match(stripped) or _RE_PARTY_RE.match(stripped):
+                    case_name = stripped
+        
+        if year is not None and (case_name is not None or not name_lines_left):
+            break
+    
+    return case_name or case_name_from_filename(filename), year
+
+def extract_legislation_block(block_lines):
+    acts = set()
+    current_act = None 
+    current_prefix = 's' 
+    
+    for line in block_lines:
+        clean_line = _CITATION_PARENS_RE.sub('', line)
+        
+        match = _SECTION_MARKER_RE.search(clean_line)
+        
+        if match:
+            act_part = clean_line[:match.start()].strip()
+            
+            indicator = match.group(1).lower()
+            current_prefix = 'r' if indicator.startswith('r') else 's'
+            sections_part = match.group(2).strip()
+            
+            if act_part:
+                act_name_match = _ACT_NAME_RE.search(act_part)
+                current_act = act_name_match.group(1).strip() if act_name_match else act_part
+            
+            sections = [sect.strip() for sect in _LIST_SPLIT_RE.split(sections_part) if sect.strip()]
+            
+            if current_act:
+                for name in add_short_forms(current_act):
+                    for sect in sections:
+                        clean_sect = _WHITESPACE_RE.sub('', sect)
+                        if clean_sect:
+                            acts.add(f"{name} {current_prefix} {clean_sect}")
+        else:
+            act_name_match = _ACT_NAME_RE.search(clean_line)
+            if act_name_match:
+                current_act = act_name_match.group(1).strip()
+                current_prefix = 'r' if 'rules' in current_act.lower() else 's'
+                for name in add_short_forms(current_act):
+                    acts.add(name)
+            else:
+                if current_act:
+                    sections = [sect.strip() for sect in _LIST_SPLIT_RE.split(clean_line) if sect.strip()]
+                    for name in add_short_forms(current_act):
+                        for sect in sections:
+                            clean_sect = _WHITESPACE_RE.sub('', sect)
+                            if clean_sect:
+                                acts.add(f"{name} {current_prefix} {clean_sect}")
+                
+    return sorted(acts)
+
+def expand_verse_list(surah, verse_text):
+    verses = []
+    for frag in _LIST_SPLIT_RE.split(verse_text):
+        # Only digits and dashes survive the clean-up, so a plain split tells singles from ranges
+        parts = _NON_RANGE_CHARS_RE.sub('', frag).replace('–', '-').split('-')
+        
+        if len(parts) == 1 and parts[0].isdigit():
+            verses.append(f"{surah}:{parts[0]}")
+        elif len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
+            verses += [f"{surah}:{v}" for v in range(int(parts[0]), int(parts[1])+1)]
+    return verses
+
+def extract_quranic_verses_block(block_lines):
+    verses = set()
+    current_surah = None 
+    
+    for l in block_lines:
+        surah_match = _SURAH_RE.search(l)
+        if surah_match:
+            current_surah = surah_match.group(1)
+            verse_match = _VERSE_LIST_RE.search(l)
+            
+            if verse_match:
+                verses.update(expand_verse_list(current_surah, verse_match.group(1)))
+            else:
+                sv_short = _SURAH_VERSE_RE.findall(l)
+                for s, v in sv_short:
+                    if 1 <= int(s) <= 114: 
+                        verses.add(f"{s}:{v}")
+        else:
+            sv_short = _CHAPTER_VERSE_RE.findall(l)
+            if sv_short:
+                for s, v in sv_short:
+                    if 1 <= int(s) <= 114:
+                        verses.add(f"{s}:{v}")
+            elif current_surah:
+                verses.update(expand_verse_list(current_surah, l))
+                
+    return sorted(verses)
+
+# ---------- PDF PROCESSING ----------
+
+def pdfium_pages(data):
+    # Yields one page at a time, closing each page's native handles as it goes
+    pdf = pdfium.PdfDocument(data)
+    try:
+        for i in range(min(PAGES_TO_EXTRACT, len(pdf))):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                # PDFium ends lines with \r\n; the extractors split on \n
+                yield textpage.get_text_range().replace("\r\n", "\n")
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        pdf.close()
+
+def pdfplumber_pages(data):
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        for page in pdf.pages[:PAGES_TO_EXTRACT]:
+            yield page.extract_text() or ""
+
+def header_complete(text):
+    # True once later pages cannot change the year, case name or citation windows
+    lines = text.split('\n')
+    _, closed_keys = split_sections(lines)
+    if len(closed_keys) < len(SECTION_MARKERS) or not _YEAR_RE.search(text):
+        return False
+    first_lines = list(itertools.islice((l.strip() for l in lines if l.strip()), 15))
+    return len(first_lines) == 15 or any(
+        _CASES_REFERRED_RE.match(l) or _PARTY_V_PARTY_RE.match(l) or _RE_PARTY_RE.match(l) for l in first_lines
+    )
+
+def read_header_pages(pages):
+    # Pages are pulled lazily and reading stops once the header is complete
+    text = None
+    for page_text in pages:
+        text = page_text if text is None else text + "\n" + page_text
+        if header_complete(text):
+            break
+    return text or ""
+
+def pdfium_text(data):
+    return read_header_pages(pdfium_pages(data))
+
+def pdfplumber_text(data):
+    return read_header_pages(pdfplumber_pages(data))
+
+def prune_text_cache():
+    # Oldest files are removed first once the cap is passed
+    cached = []
+    for entry in os.scandir(TEXT_CACHE_DIR):
+        if entry.name.endswith(".txt"):
+            try:
+                cached.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                pass
+    cached.sort()
+    for _, path in cached[:max(0, len(cached) - PDF_CACHE_MAX_ENTRIES)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Another worker pruned it first
+            pass
+
+def extract_pdf_text(data, digest):
+    cache_path = os.path.join(TEXT_CACHE_DIR, digest + ".txt")
+    if os.path.exists(cache_path):
+        with open(cache_path, encoding="utf-8") as f:
+            return f.read()
+    
+    try:
+        text = pdfium_text(data)
+    except pdfium.PdfiumError:
+        text = ""
+    if not text.strip():
+        # Slower fallback for files PDFium rejects or finds no text in
+        text = pdfplumber_text(data)
+    
+    # Written under a per-process temp name first, since two workers may parse the same file at once
+    os.makedirs(TEXT_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, cache_path)
+    prune_text_cache()
+    return text
+
+def process_pdf(name, data, digest):
+    # Runs in a worker process, so it takes raw bytes rather than Streamlit's unpicklable UploadedFile
+    text = extract_pdf_text(data, digest)
+    # Split once and shared by the line-based extractors
+    lines = text.split('\n')
+    case_name, year = scan_top(lines, name)
+    sections, _ = split_sections(lines)
+    
+    return {
+        "Case Name": case_name,
+        "Year": year,
+        "Legislation referred": extract_legislation_block(sections["legislation"]),
+        "Quranic verse(s) referred": extract_quranic_verses_block(sections["quranic"]),
+    }
@@ -11,227 +11,155 @@ Furthermore, feel free to fork this code and make improvements!
 
 import streamlit as st
 import pandas as pd
-import pdfplumber
 import re
 import io
 import os
+import functools
+import collections
+import hashlib
+import shutil
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from extraction import PDF_CACHE_MAX_ENTRIES, TEXT_CACHE_DIR, process_pdf
 
 # ---------- CONSTANTS ----------
-SHORTFORM_MAP = {
-    "Administration of Muslim Law Act": "AMLA",
-    "Women’s Charter": "WC",
-    "Women's Charter": "WC",
-    "Women`s Charter": "WC",
-    "Muslim Marriage and Divorce Rules": "MMDR"
-}
-
-# Version 8 of the database to ensure a clean wipe from the previous data
-DATA_PATH = "ssar_lite_data_v8.pkl" 
-
-# Comprehensive stop markers to cleanly close the list extraction
-STOP_PATTERNS = [
-    r'^Quranic verse', r'^Cases? referred to', r'^Issues?', r'^Background', 
-    r'^At the Syariah Court', r'^At the Appeal Board', r'^Introduction', 
-    r'^Judgment', r'^Parties', r'^Defendant', r'^Plaintiff', r'^Conclusion', 
-    r'^ORDER OF', r'^\[Editorial note'
-]
-
-# ---------- EXTRACTION HELPERS ----------
-
-def extract_header_window(lines, start_pattern, stop_patterns):
-    block, in_block = [], False
-    for line in lines: 
-        if in_block:
-            if any(re.search(p, line, re.IGNORECASE) for p in stop_patterns) or not line.strip():
-                break
-            block.append(line.strip())
-        if re.search(start_pattern, line, re.IGNORECASE):
-            in_block = True
-    return block
-
-def add_short_forms(name):
-    out = [name]
-    for long, short in SHORTFORM_MAP.items():
-        if long in name and short not in name:
-            out.append(name.replace(long, short))
-    return out
-
-def extract_case_name_first_block(text, filename):
-    lines = [l.strip() for l in text.split('\n') if l.strip()]
-    
-    for line in lines[:15]:
-        if re.match(r"^case\(s\)\s+referred\s+to", line, re.IGNORECASE):
-            break
-        if re.match(r"^[A-Z]{2,}\s+v\s+[A-Z]{2,}$", line):
-            return line
-        if re.match(r"^Re\s+[A-Z]{2,}$", line, re.IGNORECASE):
-            return line
-
-    clean_name = os.path.basename(filename)
-    clean_name = os.path.splitext(clean_name)[0]
-    clean_name = re.sub(r'^\d+\s*SSAR[\\/]', '', clean_name)
-    return clean_name.strip()
-
-def extract_year(text):
-    years = re.findall(r"(20\d{2}|19\d{2})", text)
-    return int(years[0]) if years else None
-
-def extract_legislation_block(text):
-    lines = text.split('\n')
-    block_lines = extract_header_window(lines, r'^Legislation referred to', STOP_PATTERNS)
-    acts = []
-    current_act = None 
-    current_prefix = 's' 
-    
-    for line in block_lines:
-        clean_line = re.sub(r'\([^)]*(?:Cap|Rev\s*Ed|Act|Ordinance|19\d\d|20\d\d)[^)]*\)', '', line, flags=re.IGNORECASE)
-        
-        match = re.search(r"(?<!['’`])\b(s|ss|section|r|rule|rr)\b\s*(.*)", clean_line, re.IGNORECASE)
-        
-        if match:
-            act_part = clean_line[:match.start()].strip()
-            
-            indicator = match.group(1).lower()
-            current_prefix = 'r' if indicator.startswith('r') else 's'
-            sections_part = match.group(2).strip()
-            
-            if act_part:
-                act_name_match = re.search(r"(.*?\b(?:Act|Charter|Rules|Ordinance)\b)", act_part, re.IGNORECASE)
-                current_act = act_name_match.group(1).strip() if act_name_match else act_part
-            
-            sections = [sect.strip() for sect in re.split(r',|and', sections_part) if sect.strip()]
-            
-            if current_act:
-                for name in add_short_forms(current_act):
-                    for sect in sections:
-                        clean_sect = re.sub(r'\s+', '', sect)
-                        if clean_sect:
-                            acts.append(f"{name} {current_prefix} {clean_sect}")
-        else:
-            act_name_match = re.search(r"(.*?\b(?:Act|Charter|Rules|Ordinance)\b)", clean_line, re.IGNORECASE)
-            if act_name_match:
-                current_act = act_name_match.group(1).strip()
-                current_prefix = 'r' if 'rules' in current_act.lower() else 's'
-                for name in add_short_forms(current_act):
-                    acts.append(name)
-            else:
-                if current_act:
-                    sections = [sect.strip() for sect in re.split(r',|and', clean_line) if sect.strip()]
-                    for name in add_short_forms(current_act):
-                        for sect in sections:
-                            clean_sect = re.sub(r'\s+', '', sect)
-                            if clean_sect:
-                                acts.append(f"{name} {current_prefix} {clean_sect}")
-                
-    return sorted(set(acts))
 
-def extract_quranic_verses_block(text):
-    lines = text.split('\n')
-    block_lines = extract_header_window(lines, r'^Quranic verse\(s\) referred to', STOP_PATTERNS)
-    verses = []
-    current_surah = None 
-    
-    for l in block_lines:
-        surah_match = re.search(r'Surah\s*(\d+)', l, re.IGNORECASE)
-        if surah_match:
-            current_surah = surah_match.group(1)
-            verse_match = re.search(r'verse[s]?\s*(.*)', l, re.IGNORECASE)
-            
-            if verse_match:
-                verse_part = verse_match.group(1)
-                for frag in re.split(r',|and', verse_part):
-                    frag_clean = re.sub(r'[^\d\-\–]', '', frag.strip())
-                    if not frag_clean: continue
-                    
-                    if re.search(r'\d+[–-]\d+', frag_clean):
-                        parts = re.split(r'[–-]', frag_clean)
-                        if len(parts) == 2:
-                            verses += [f"{current_surah}:{v}" for v in range(int(parts[0]), int(parts[1])+1)]
-                    elif frag_clean.isdigit():
-                        verses.append(f"{current_surah}:{frag_clean}")
-            else:
-                sv_short = re.findall(r'Surah\s*(\d+)\s*[:]\s*(\d+)', l, re.IGNORECASE)
-                for s, v in sv_short:
-                    if 1 <= int(s) <= 114: 
-                        verses.append(f"{s}:{v}")
-        else:
-            sv_short = re.findall(r'\b(\d{1,3})\s*[:]\s*(\d+)\b', l, re.IGNORECASE)
-            if sv_short:
-                for s, v in sv_short:
-                    if 1 <= int(s) <= 114:
-                        verses.append(f"{s}:{v}")
-            elif current_surah:
-                for frag in re.split(r',|and', l):
-                    frag_clean = re.sub(r'[^\d\-\–]', '', frag.strip())
-                    if not frag_clean: continue
-                    
-                    if re.search(r'\d+[–-]\d+', frag_clean):
-                        parts = re.split(r'[–-]', frag_clean)
-                        if len(parts) == 2:
-                            verses += [f"{current_surah}:{v}" for v in range(int(parts[0]), int(parts[1])+1)]
-                    elif frag_clean.isdigit():
-                        verses.append(f"{current_surah}:{frag_clean}")
-                
-    return sorted(set(verses))
+# Version 11 of the database: a folder of Feather files holding the cases and their prebuilt search indices
+DATA_DIR = "ssar_lite_data_v11"
+DATA_PATH = os.path.join(DATA_DIR, "cases.feather")
+LEG_INDEX_PATH = os.path.join(DATA_DIR, "legislation_index.feather")
+VERSE_INDEX_PATH = os.path.join(DATA_DIR, "verse_index.feather")
+
+# Workers are never forked from the multi-threaded Streamlit server; forkserver where available, else spawn
+POOL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# ---------- SEARCH PATTERNS ----------
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_DIGITS_RE = re.compile(r'\d+')
+
+# Section number after every s/r marker section_pattern() accepts; the lookahead also catches "s s52(3)"
+_ENTRY_SECTION_KEYS_RE = re.compile(r'(?=\b(?:s|r)\s*([0-9A-Za-z]*))', re.IGNORECASE)
+_SECTION_KEY_RE = re.compile(r'[0-9A-Za-z]*', re.IGNORECASE)
+
+# ---------- PDF CACHE ----------
+
+@st.cache_resource(show_spinner=False)
+def processed_pdf_cache():
+    # Records keyed by (file name, file hash), shared across sessions; the pool workers cannot see it
+    return collections.OrderedDict()
+
+def cache_pdf_record(pdf_cache, key, record):
+    pdf_cache[key] = record
+    # Oldest records are evicted first once the cap is reached
+    while len(pdf_cache) > PDF_CACHE_MAX_ENTRIES:
+        pdf_cache.popitem(last=False)
+
+def clear_pdf_cache():
+    processed_pdf_cache().clear()
+    shutil.rmtree(TEXT_CACHE_DIR, ignore_errors=True)
 
 # ---------- SEARCH LOGIC ----------
 
-def normalize(s): return re.sub(r'[\s\(\)\[\]\.,:\-]', '', str(s).lower())
+# Punctuation stripped by normalize(); str.split() drops all Unicode whitespace first
+_NORMALIZE_TABLE = str.maketrans('', '', '()[].,:-')
+
+def normalize(s): return ''.join(str(s).lower().split()).translate(_NORMALIZE_TABLE)
+
+def section_keys(leg):
+    # Entries without a marker keep one "" key so act-only searches still see them
+    return sorted({key.casefold() for key in _ENTRY_SECTION_KEYS_RE.findall(leg)}) or [""]
 
-def search_legislation(df, act_keyword, section_query):
-    if df.empty: return []
+def build_legislation_index(df):
+    leg_index = (
+        df[["Case Name", "Legislation referred"]]
+        .explode("Legislation referred")
+        .dropna(subset=["Legislation referred"])
+        .rename(columns={"Case Name": "case", "Legislation referred": "leg_raw"})
+        .reset_index(drop=True)
+    )
+    leg_index["leg_norm"] = leg_index["leg_raw"].map(normalize)
+    leg_index["section_key"] = leg_index["leg_raw"].map(section_keys)
+    # One row per section number, sorted so a section search only scans the slice citing that number
+    return leg_index.explode("section_key").sort_values("section_key", kind="stable").reset_index(drop=True)
+
+@functools.lru_cache(maxsize=256)
+def section_pattern(section_clean):
+    escaped_sec = re.escape(section_clean)
+    return re.compile(rf'\b(?:s|r)\s*{escaped_sec}(?!\d|[a-zA-Z])', re.IGNORECASE)
+
+def search_legislation(leg_index, act_keyword, section_query):
+    if leg_index.empty: return []
     
     act_kw_norm = normalize(act_keyword)
-    section_clean = re.sub(r'\s+', '', str(section_query))
+    section_clean = _WHITESPACE_RE.sub('', str(section_query))
+    
+    if section_clean:
+        key = _SECTION_KEY_RE.match(section_clean).group(0).casefold()
+        keys = leg_index["section_key"]
+        leg_index = leg_index.iloc[keys.searchsorted(key, side="left"):keys.searchsorted(key, side="right")]
+    
+    mask = leg_index["leg_norm"].str.contains(act_kw_norm, regex=False)
     
-    if not section_clean:
-        def is_match_act(leg_list):
-            return any(act_kw_norm in normalize(leg) for leg in leg_list) if isinstance(leg_list, list) else False
-        mask = df["Legislation referred"].apply(is_match_act)
-        return sorted(df.loc[mask, "Case Name"].unique())
+    if section_clean:
+        mask &= leg_index["leg_raw"].str.contains(section_pattern(section_clean))
         
-    escaped_sec = re.escape(section_clean)
-    pattern = re.compile(rf'\b(?:s|r)\s*{escaped_sec}(?!\d|[a-zA-Z])', re.IGNORECASE)
-
-    def is_match(leg_list):
-        if not isinstance(leg_list, list): return False
-        return any(act_kw_norm in normalize(leg) and pattern.search(leg) for leg in leg_list)
-
-    mask = df["Legislation referred"].apply(is_match)
-    return sorted(df.loc[mask, "Case Name"].unique())
-
-def search_quranic(df, verse_query):
-    if df.empty: return []
-    nums = re.findall(r'\d+', str(verse_query))
+    return sorted(leg_index.loc[mask, "case"].unique())
+
+def build_verse_index(df):
+    # Each case is filed under both "surah" and "surah:verse", so either query form is a dict lookup
+    verse_index = collections.defaultdict(set)
+    for name, verses in zip(df["Case Name"], df["Quranic verse(s) referred"]):
+        for v in verses:
+            verse_index[v.split(':')[0]].add(name)
+            verse_index[v].add(name)
+    return {key: sorted(names) for key, names in verse_index.items()}
+
+def search_quranic(verse_index, verse_query):
+    nums = _DIGITS_RE.findall(str(verse_query))
+    if not nums: return []
     
-    def is_match(q_list):
-        if not isinstance(q_list, list): return False
-        for v in q_list:
-            v_parts = v.split(':')
-            if len(nums) == 1 and v_parts[0] == nums[0]: 
-                return True
-            if len(nums) >= 2 and v_parts[0] == nums[0] and v_parts[1] == nums[1]: 
-                return True
-        return False
-
-    mask = df["Quranic verse(s) referred"].apply(is_match)
-    return sorted(df.loc[mask, "Case Name"].unique())
+    key = nums[0] if len(nums) == 1 else f"{nums[0]}:{nums[1]}"
+    return verse_index.get(key, [])
 
 # ---------- SAVE/LOAD/CLEAR ----------
 
-def save_df(df): 
-    df.to_pickle(DATA_PATH)
+def save_bundle(df): 
+    # The search indices are built once here and persisted, so loading the database needs no rebuild
+    df = df.reset_index(drop=True)
+    leg_index = build_legislation_index(df)
+    verse_index = build_verse_index(df)
+    
+    os.makedirs(DATA_DIR, exist_ok=True)
+    leg_index.to_feather(LEG_INDEX_PATH)
+    pd.DataFrame({"key": list(verse_index), "cases": list(verse_index.values())}).to_feather(VERSE_INDEX_PATH)
+    # Written last: its mtime keys the load cache
+    df.to_feather(DATA_PATH)
+    return {"df": df, "leg_index": leg_index, "verse_index": verse_index, "mtime": os.path.getmtime(DATA_PATH)}
 
 @st.cache_data(show_spinner=False)
-def load_df_cached(file_mtime=None):
+def load_bundle_cached(file_mtime=None):
     if os.path.exists(DATA_PATH):
-        return pd.read_pickle(DATA_PATH)
+        # Kept Arrow-backed so the citation lists are not rebuilt as Python lists
+        verse_frame = pd.read_feather(VERSE_INDEX_PATH, dtype_backend="pyarrow")
+        return {
+            "df": pd.read_feather(DATA_PATH, dtype_backend="pyarrow"),
+            "leg_index": pd.read_feather(LEG_INDEX_PATH),
+            "verse_index": dict(zip(verse_frame["key"], verse_frame["cases"])),
+            "mtime": file_mtime,
+        }
     return None
 
+@st.cache_data(show_spinner=False)
+def build_xlsx_bytes(_df, file_mtime):
+    # Keyed on the bundle's mtime, so the workbook is only rebuilt when the saved cases change
+    output = io.BytesIO()
+    _df.to_excel(output, index=False, engine="xlsxwriter")
+    return output.getvalue()
+
 def clear_database():
-    if os.path.exists(DATA_PATH): 
-        os.remove(DATA_PATH)
-    st.session_state.df = None
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+    st.session_state.bundle = None
     st.cache_data.clear()
     st.rerun()
 
@@ -241,51 +169,75 @@ st.set_page_config(page_title="SSAR Reference Engine", layout="wide")
 st.title("SSAR Legislation & Quranic Reference Engine")
 st.markdown("A focused tool to extract and search statutory and religious citations from Syariah Court cases.")
 
-if "df" not in st.session_state:
-    st.session_state.df = load_df_cached(os.path.getmtime(DATA_PATH) if os.path.exists(DATA_PATH) else None)
+if "bundle" not in st.session_state:
+    st.session_state.bundle = load_bundle_cached(os.path.getmtime(DATA_PATH) if os.path.exists(DATA_PATH) else None)
 
-df = st.session_state.df
+bundle = st.session_state.bundle
+df = bundle["df"] if bundle else None
 
 with st.expander("Database Management"):
     if st.button("Clear Database"):
         clear_database()
+    # Lets previously seen PDFs be re-extracted, e.g. after the extractors are updated
+    if st.button("Clear PDF Cache"):
+        clear_pdf_cache()
+        st.success("PDF cache cleared.")
 
 with st.expander("Upload PDFs", expanded=(df is None)):
     uploaded_files = st.file_uploader("Upload PDFs", type=["pdf"], accept_multiple_files=True)
     
     if uploaded_files:
         if st.button("Process Uploaded Files"): 
-            records = []
             progress_bar = st.progress(0)
             status_text = st.empty()
             
-            for idx, upl in enumerate(uploaded_files):
-                status_text.text(f"Processing {upl.name}...")
-                try:
-                    with pdfplumber.open(upl) as pdf:
-                        pages_to_extract = pdf.pages[:3]
-                        text = "\n".join([page.extract_text() or "" for page in pages_to_extract])
-                    
-                    records.append({
-                        "Case Name": extract_case_name_first_block(text, upl.name),
-                        "Year": extract_year(text),
-                        "Legislation referred": extract_legislation_block(text),
-                        "Quranic verse(s) referred": extract_quranic_verses_block(text),
-                    })
-                except Exception as e:
-                    st.warning(f"Error in {upl.name}: {e}")
-                progress_bar.progress(int(100 * (idx+1)/len(uploaded_files)))
+            status_text.text(f"Processing {len(uploaded_files)} files...")
+            pdf_cache = processed_pdf_cache()
+            jobs = []
+            for upl in uploaded_files:
+                data = upl.getvalue()
+                jobs.append((upl.name, data, hashlib.blake2b(data, digest_size=16).hexdigest()))
+            
+            # Cache hits are taken up front, so eviction during this run cannot drop them
+            results = {}
+            for name, _, digest in jobs:
+                record = pdf_cache.get((name, digest))
+                if record is not None:
+                    results[(name, digest)] = record
+            # Only files not seen before are sent to the pool
+            misses = {(name, digest): (name, data, digest) for name, data, digest in jobs if (name, digest) not in results}
+            max_workers = max(1, min(len(misses), os.cpu_count() or 1))
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(POOL_START_METHOD)) as executor:
+                futures = {executor.submit(process_pdf, *job): key for key, job in misses.items()}
                 
+                # Progress advances as each worker finishes, in whatever order that happens
+                for done, future in enumerate(as_completed(futures), start=1):
+                    name, digest = futures[future]
+                    try:
+                        results[(name, digest)] = future.result()
+                        cache_pdf_record(pdf_cache, (name, digest), results[(name, digest)])
+                    except Exception as e:
+                        st.warning(f"Error in {name}: {e}")
+                    progress_bar.progress(int(100 * done/len(misses)))
+            
+            # Assembled in upload order so the database rows keep the order the files were given in
+            records = [results[(name, digest)] for name, _, digest in jobs if (name, digest) in results]
+            progress_bar.progress(100)
             status_text.text("Done processing.")
             
             if records:
-                save_df(pd.DataFrame(records))
-                st.session_state.df = load_df_cached(os.path.getmtime(DATA_PATH))
-                df = st.session_state.df
+                # Use the bundle just built instead of reading it back from disk
+                st.session_state.bundle = save_bundle(pd.DataFrame(records))
+                load_bundle_cached.clear()
+                bundle = st.session_state.bundle
+                df = bundle["df"]
                 st.success(f"Processed and saved {len(df)} cases. You can now use the search engine below!")
 
 if df is not None and not df.empty:
     
+    leg_index = bundle["leg_index"]
+    verse_index = bundle["verse_index"]
+    
     # --- SEARCH ENGINE UI ---
     st.subheader("🔍 Search Engine")
     col1, col2 = st.columns(2)
@@ -294,7 +246,7 @@ if df is not None and not df.empty:
         kw = st.text_input("Act/Statute (e.g., AMLA, WC, MMDR)", "AMLA")
         sec = st.text_input("Section/Rule (e.g., 52, 14(1))", "")
         if kw or sec:
-            results = search_legislation(df, kw, sec)
+            results = search_legislation(leg_index, kw, sec)
             if results:
                 st.success(f"Found {len(results)} matching cases:")
                 for r in results:
@@ -306,7 +258,7 @@ if df is not None and not df.empty:
         st.markdown("### Quranic Search")
         v = st.text_input("Surah or Surah:Verse (e.g., 2 or 2:236)", "")
         if v:
-            q_results = search_quranic(df, v)
+            q_results = search_quranic(verse_index, v)
             if q_results:
                 st.success(f"Found {len(q_results)} matching cases:")
                 for r in q_results:
@@ -321,11 +273,9 @@ if df is not None and not df.empty:
     if st.checkbox("Show full database table"):
         st.dataframe(df)
         
-    output = io.BytesIO()
-    df.to_excel(output, index=False)
     st.download_button(
         "Download database (.xlsx)", 
-        data=output.getvalue(),
+        data=build_xlsx_bytes(df, bundle["mtime"]),
         file_name="ssar_reference_cases.xlsx", 
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
@@ -0,0 +1,48 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraction import extract_legislation_block
+
+# The app module runs its page on import; a scratch cwd keeps it from loading a real database
+_cwd = os.getcwd()
+os.chdir(tempfile.mkdtemp())
+try:
+    from streamlit_app import build_legislation_index, search_legislation
+finally:
+    os.chdir(_cwd)
+
+
+class SearchLegislationTest(unittest.TestCase):
+    def setUp(self):
+        blocks = {
+            "ABC v DEF": ["Administration of Muslim Law Act s 35, s 52(3)"],
+            "Re GHI": ["Women's Charter ss 59 and s 112"],
+            "JKL v MNO": ["AMLA s 46(1)(s 52)"],
+        }
+        df = pd.DataFrame([
+            {"Case Name": name, "Legislation referred": extract_legislation_block(lines)}
+            for name, lines in blocks.items()
+        ])
+        self.leg_index = build_legislation_index(df)
+
+    def test_second_marker_in_entry_is_searchable(self):
+        self.assertEqual(search_legislation(self.leg_index, "AMLA", "52"), ["ABC v DEF", "JKL v MNO"])
+        self.assertEqual(search_legislation(self.leg_index, "AMLA", "52(3)"), ["ABC v DEF"])
+        self.assertEqual(search_legislation(self.leg_index, "WC", "112"), ["Re GHI"])
+
+    def test_first_marker_still_matches(self):
+        self.assertEqual(search_legislation(self.leg_index, "AMLA", "35"), ["ABC v DEF"])
+        self.assertEqual(search_legislation(self.leg_index, "AMLA", "46"), ["JKL v MNO"])
+
+    def test_act_only_search_lists_each_case_once(self):
+        self.assertEqual(search_legislation(self.leg_index, "AMLA", ""), ["ABC v DEF", "JKL v MNO"])
+
+
+if __name__ == "__main__":
+    unittest.main()